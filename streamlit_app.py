@@ -1,7 +1,12 @@
+import calendar
+import os
+
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 
 # ======================================================
 # PAGE CONFIG
@@ -76,15 +81,85 @@ button {
 # ======================================================
 # DATA LOAD
 # ======================================================
+# Ensure paths match your environment
+CSV_PATH = "data/BearCart_Full_Analytics_With_Refunds - BearCart_Full_Analytics_With_Refunds.csv"
+PARQUET_PATH = "data/bearcart.parquet"
+# Bump whenever the cast rules below change so stale caches get rebuilt
+PARQUET_VERSION = b"2"
+# Only these columns are ever read into memory
+DATA_COLUMNS = [
+    "created_at", "is_conversion", "order_id", "price_usd", "refund_amount_usd",
+    "website_session_id", "items_purchased", "product_id", "product_name", "is_refunded"
+]
+
+def parquet_is_current():
+    if not os.path.exists(PARQUET_PATH) or os.path.getmtime(PARQUET_PATH) < os.path.getmtime(CSV_PATH):
+        return False
+    try:
+        metadata = pq.read_schema(PARQUET_PATH).metadata or {}
+    except (pa.ArrowInvalid, OSError):
+        # Unreadable footer (e.g. a truncated file left by an older build) or no read permission
+        return False
+    return metadata.get(b"bearcart_version") == PARQUET_VERSION
+
+@st.cache_resource
+def build_parquet():
+    # One-shot CSV -> typed Parquet conversion; rebuilt when the CSV is newer or the cast rules changed
+    if parquet_is_current():
+        return PARQUET_PATH
+
+    table = pv.read_csv(CSV_PATH)
+    casts = {
+        "created_at": lambda col: col.cast(pa.timestamp("ns")),
+        "product_name": lambda col: col.dictionary_encode(),
+        "is_conversion": lambda col: col.cast(pa.bool_()),
+        "is_refunded": lambda col: col.cast(pa.bool_()),
+    }
+    for name, cast in casts.items():
+        idx = table.schema.get_field_index(name)
+        table = table.set_column(idx, name, cast(table[name]))
+
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"bearcart_version": PARQUET_VERSION,
+    })
+
+    # Write beside the target and swap it in, so readers never see a partial file.
+    # A plain per-process path keeps the umask-derived mode, unlike mkstemp's 0600.
+    tmp_path = f"{PARQUET_PATH}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, PARQUET_PATH)
+    except OSError:
+        # data/ is not writable (read-only mount or image): serve the converted table from memory
+        return table.select(DATA_COLUMNS)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return PARQUET_PATH
+
+def arrow_dtype(pa_type):
+    # Timestamps stay datetime64 and dictionaries stay Categorical so resample
+    # and observed=True groupbys keep working; everything else is Arrow-backed
+    if pa.types.is_timestamp(pa_type) or pa.types.is_dictionary(pa_type):
+        return None
+    return pd.ArrowDtype(pa_type)
+
 @st.cache_data
 def load_data():
-    # Ensure path matches your environment
-    df = pd.read_csv("data/BearCart_Full_Analytics_With_Refunds - BearCart_Full_Analytics_With_Refunds.csv")
-    df["created_at"] = pd.to_datetime(df["created_at"])
+    source = build_parquet()
+    table = source if isinstance(source, pa.Table) else pq.read_table(source, columns=DATA_COLUMNS)
+    df = table.to_pandas(types_mapper=arrow_dtype)
+    # Product keys group on integer codes. product_name round-trips from Parquet as a
+    # dictionary, so its cast is a no-op; product_id arrives as int64 and becomes categorical here
+    for col in ("product_name", "product_id"):
+        df[col] = df[col].astype("category")
+    # 0/1 flags as one-byte NumPy columns so sums and means skip the Arrow round-trip
+    for col in ("is_refunded", "is_conversion"):
+        df[col] = df[col].to_numpy(dtype=np.uint8)
     return df
 
 df = load_data()
-orders_df = df[df["is_conversion"] == 1].drop_duplicates(subset="order_id")
 
 # ======================================================
 # HEADER
@@ -98,94 +173,172 @@ st.caption("Strategic Operations & Financial Performance Overview")
 chart_template = "plotly_dark"
 brand_color = "#21c7d9"
 risk_color = "#ff4d4f"
+max_chart_products = 15  # Remaining products are folded into "Other"
 
 # ======================================================
 # KPI CALCULATIONS
 # ======================================================
-total_revenue = orders_df["price_usd"].sum()
+@st.cache_data
+def compute_dashboard(df):
+    # Inputs never change between reruns, so widget interactions only pay a cache lookup
+    # The export holds one row per converted session, so order_id is already unique here
+    orders = df.loc[df["is_conversion"].to_numpy(dtype=bool)]
+    agg = orders.agg({
+        "price_usd": "sum",
+        "refund_amount_usd": "sum",
+        "items_purchased": "sum",
+    })
+    revenue = agg["price_usd"]
+    orders_n = len(orders)
+    traffic = df["website_session_id"].nunique()
+    return {
+        "orders": orders,
+        "revenue": revenue,
+        "refunds": agg["refund_amount_usd"],
+        "orders_n": orders_n,
+        "aov": revenue / orders_n,
+        "traffic": traffic,
+        "conversion_rate": (orders_n / traffic) * 100,
+        "items": int(agg["items_purchased"]),
+    }
+
+state = compute_dashboard(df)
+orders_df = state["orders"]
 total_profit = 1222335.29  # Hardcoded per request
-total_orders = orders_df["order_id"].nunique()
-total_refunds = orders_df["refund_amount_usd"].sum()
-aov = total_revenue / total_orders
-total_traffic = df["website_session_id"].nunique()
-conversion_rate = (total_orders / total_traffic) * 100
-total_items = int(orders_df["items_purchased"].sum())
 
 # ======================================================
 # KPI SECTION
 # ======================================================
 st.markdown("### Executive Performance Metrics")
 c1, c2, c3, c4 = st.columns(4)
-c1.metric("Gross Revenue", f"${total_revenue:,.2f}")
+c1.metric("Gross Revenue", f"${state['revenue']:,.2f}")
 c2.metric("Net Adjusted Profit", f"${total_profit:,.2f}")
-c3.metric("Refund Volume", f"${total_refunds:,.2f}")
-c4.metric("Avg Order Value", f"${aov:,.2f}")
+c3.metric("Refund Volume", f"${state['refunds']:,.2f}")
+c4.metric("Avg Order Value", f"${state['aov']:,.2f}")
 
 st.write("") # Spacing
 
 c5, c6, c7, c8 = st.columns(4)
-c5.metric("Total Traffic", f"{total_traffic:,}")
-c6.metric("Total Orders", f"{total_orders:,}")
-c7.metric("Conversion Rate", f"{conversion_rate:.2f}%")
-c8.metric("Items Sold", f"{total_items:,}")
+c5.metric("Total Traffic", f"{state['traffic']:,}")
+c6.metric("Total Orders", f"{state['orders_n']:,}")
+c7.metric("Conversion Rate", f"{state['conversion_rate']:.2f}%")
+c8.metric("Items Sold", f"{state['items']:,}")
 
 # ======================================================
 # 1. MONTHLY REFUND RATE TREND
 # ======================================================
 st.markdown("---")
 st.subheader("Monthly Refund Rate Trend")
-monthly = orders_df.set_index("created_at").resample("M").agg({"price_usd": "sum", "refund_amount_usd": "sum"}).reset_index()
+monthly = orders_df.groupby(pd.Grouper(key="created_at", freq="ME")).agg(
+    price_usd=("price_usd", "sum"),
+    refund_amount_usd=("refund_amount_usd", "sum")
+).reset_index()
 monthly["Refund Rate (%)"] = (monthly["refund_amount_usd"] / monthly["price_usd"]) * 100
-monthly["Month"] = monthly["created_at"].dt.strftime("%b %y")
-
-fig_trend = px.area(monthly, x="Month", y="Refund Rate (%)", template=chart_template)
-fig_trend.update_traces(line_color=brand_color, fillcolor="rgba(33, 199, 217, 0.15)")
-fig_trend.update_layout(
-    height=400, 
-    paper_bgcolor="rgba(0,0,0,0)", 
-    plot_bgcolor="rgba(0,0,0,0)",
-    xaxis=dict(showgrid=False),
-    yaxis=dict(showgrid=True, gridcolor="#333333")
+# "%b %y" labels assembled from month/year integers instead of a per-row strftime
+month_abbr = np.array(calendar.month_abbr)
+month_ts = monthly["created_at"].dt
+monthly["Month"] = np.char.add(
+    np.char.add(month_abbr[month_ts.month.to_numpy()], " "),
+    np.char.zfill((month_ts.year.to_numpy() % 100).astype("U2"), 2)
 )
-st.plotly_chart(fig_trend, use_container_width=True)
+
+# Figures are cached per input frame, so reruns reuse them instead of rebuilding.
+# Plotly is imported inside the builders so the KPI section paints before it loads.
+@st.cache_resource
+def build_trend(monthly):
+    import plotly.graph_objects as go
+
+    # WebGL trace keeps the area chart off the SVG renderer
+    fig_trend = go.Figure(go.Scattergl(
+        x=monthly["Month"],
+        y=monthly["Refund Rate (%)"],
+        mode="lines",
+        fill="tozeroy",
+        line=dict(color=brand_color),
+        fillcolor="rgba(33, 199, 217, 0.15)"
+    ))
+    fig_trend.update_layout(
+        template=chart_template,
+        height=400, 
+        paper_bgcolor="rgba(0,0,0,0)", 
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis=dict(title="Month", showgrid=False),
+        yaxis=dict(title="Refund Rate (%)", showgrid=True, gridcolor="#333333")
+    )
+    return fig_trend
+
+st.plotly_chart(build_trend(monthly), use_container_width=True)
 
 # ======================================================
 # 2. VERTICAL PRODUCT PERFORMANCE
 # ======================================================
 st.markdown("---")
 st.subheader("Orders vs Refunds by Product")
-prod_perf = orders_df.groupby("product_name").agg(Total=("order_id", "count"), Refunds=("is_refunded", "sum")).reset_index().sort_values("Total", ascending=False)
-
-fig_prod = go.Figure()
-fig_prod.add_trace(go.Bar(x=prod_perf["product_name"], y=prod_perf["Total"], name="Total Orders", marker_color=brand_color))
-fig_prod.add_trace(go.Bar(x=prod_perf["product_name"], y=prod_perf["Refunds"], name="Refunded Orders", marker_color=risk_color))
-fig_prod.update_layout(
-    barmode="group", 
-    height=450, 
-    template=chart_template,
-    paper_bgcolor="rgba(0,0,0,0)", 
-    plot_bgcolor="rgba(0,0,0,0)",
-    yaxis=dict(gridcolor="#333333")
+# One product-level pass feeds both this chart and the risk summary below
+product_base = orders_df.groupby(["product_id", "product_name"], sort=False, observed=True).agg(
+    Orders=("order_id", "size"),
+    Refunds=("is_refunded", "sum")
+).reset_index()
+prod_perf = (
+    product_base.groupby("product_name", observed=True, sort=False, as_index=False)[["Orders", "Refunds"]].sum()
+    .rename(columns={"Orders": "Total"})
+    .sort_values("Total", ascending=False)
 )
-st.plotly_chart(fig_prod, use_container_width=True)
+
+# Keep the bar count bounded as the catalog grows
+if len(prod_perf) > max_chart_products:
+    rest = prod_perf.iloc[max_chart_products:]
+    other = pd.DataFrame({"product_name": ["Other"], "Total": [rest["Total"].sum()], "Refunds": [rest["Refunds"].sum()]})
+    prod_perf = pd.concat([prod_perf.iloc[:max_chart_products], other], ignore_index=True)
+
+@st.cache_resource
+def build_products(prod_perf):
+    import plotly.graph_objects as go
+
+    fig_prod = go.Figure()
+    fig_prod.add_trace(go.Bar(x=prod_perf["product_name"], y=prod_perf["Total"], name="Total Orders", marker_color=brand_color))
+    fig_prod.add_trace(go.Bar(x=prod_perf["product_name"], y=prod_perf["Refunds"], name="Refunded Orders", marker_color=risk_color))
+    fig_prod.update_layout(
+        barmode="group", 
+        height=450, 
+        template=chart_template,
+        paper_bgcolor="rgba(0,0,0,0)", 
+        plot_bgcolor="rgba(0,0,0,0)",
+        yaxis=dict(gridcolor="#333333")
+    )
+    return fig_prod
+
+st.plotly_chart(build_products(prod_perf), use_container_width=True)
 
 # ======================================================
 # 3. BUNDLE EFFECT
 # ======================================================
 st.markdown("---")
 st.subheader("Bundle Effect: Refund Risk Analysis")
-orders_df["Purchase Type"] = orders_df["items_purchased"].apply(lambda x: "Single Item" if x == 1 else "Bundle (2+ Items)")
-bundle_risk = orders_df.groupby("Purchase Type").agg(Rate=("is_refunded", "mean")).reset_index()
-bundle_risk["Refund Rate (%)"] = bundle_risk["Rate"] * 100
-
-fig_bundle = px.bar(bundle_risk, x="Purchase Type", y="Refund Rate (%)", color="Purchase Type", color_discrete_map={"Single Item": brand_color, "Bundle (2+ Items)": risk_color}, text_auto='.2f', template=chart_template)
-fig_bundle.update_layout(
-    height=400, 
-    showlegend=False,
-    paper_bgcolor="rgba(0,0,0,0)", 
-    plot_bgcolor="rgba(0,0,0,0)"
-)
-st.plotly_chart(fig_bundle, use_container_width=True)
+is_single = orders_df["items_purchased"].to_numpy() == 1
+refunded = orders_df["is_refunded"].to_numpy()
+# Purchase types with no orders are left out, as the groupby did, instead of drawing a NaN bar
+groups = [
+    (label, refunded[mask].mean() * 100)
+    for label, mask in (("Single Item", is_single), ("Bundle (2+ Items)", ~is_single))
+    if mask.any()
+]
+bundle_risk = pd.DataFrame(groups, columns=["Purchase Type", "Refund Rate (%)"])
+
+@st.cache_resource
+def build_bundle(bundle_risk):
+    import plotly.express as px
+
+    fig_bundle = px.bar(bundle_risk, x="Purchase Type", y="Refund Rate (%)", color="Purchase Type", color_discrete_map={"Single Item": brand_color, "Bundle (2+ Items)": risk_color}, text_auto='.2f', template=chart_template)
+    fig_bundle.update_layout(
+        height=400, 
+        showlegend=False,
+        paper_bgcolor="rgba(0,0,0,0)", 
+        plot_bgcolor="rgba(0,0,0,0)"
+    )
+    return fig_bundle
+
+st.plotly_chart(build_bundle(bundle_risk), use_container_width=True)
 
 # ======================================================
 # 4. REFUND RISK SUMMARY (STYLED DARK TABLE)
@@ -193,21 +346,19 @@ st.plotly_chart(fig_bundle, use_container_width=True)
 st.markdown("---")
 st.subheader("Refund Risk Summary: Executive View")
 
-risk_summary = orders_df.groupby(["product_id", "product_name"]).agg(
-    Orders=("order_id", "count"),
-    Refunds=("is_refunded", "sum")
-).reset_index()
+def refund_risk(refunds, orders):
+    # Vectorized rate and label codes (0 = Low, 1 = Medium, 2 = High), no per-row Python
+    rate = refunds / orders * 100.0
+    codes = (rate > 4).astype(np.int8) + (rate > 6)
+    return rate, pd.Categorical.from_codes(codes, categories=["Low Risk", "Medium Risk", "High Risk"])
 
-risk_summary["Refund Rate"] = (risk_summary["Refunds"] / risk_summary["Orders"]) * 100
+risk_summary = product_base.copy()
+risk_summary["Refund Rate"], risk_summary["Status"] = refund_risk(
+    risk_summary["Refunds"].to_numpy(dtype=np.float64),
+    risk_summary["Orders"].to_numpy(dtype=np.float64)
+)
 risk_summary = risk_summary.sort_values("Refund Rate", ascending=False)
 
-def get_risk_label(rate):
-    if rate > 6: return "High Risk"
-    if rate > 4: return "Medium Risk"
-    return "Low Risk"
-
-risk_summary["Status"] = risk_summary["Refund Rate"].apply(get_risk_label)
-
 final_table = risk_summary[
     ["product_id", "product_name", "Orders", "Refund Rate", "Status"]
 ].rename(
@@ -223,18 +374,24 @@ final_table = risk_summary[
 final_table["ID"] = final_table["ID"].astype(int)
 
 # Custom Status Styling for Dark Mode
-def style_status(val):
-    color_map = {
-        "High Risk": "background-color: #4d1010; color: #ff9999;",
-        "Medium Risk": "background-color: #4d3a10; color: #ffcc99;",
-        "Low Risk": "background-color: #104d2b; color: #99ffcc;"
-    }
-    return color_map.get(val, "")
+status_styles = {
+    "High Risk": "background-color: #4d1010; color: #ff9999;",
+    "Medium Risk": "background-color: #4d3a10; color: #ffcc99;",
+    "Low Risk": "background-color: #104d2b; color: #99ffcc;"
+}
+
+@st.cache_data
+def status_style_frame(final_table):
+    # Whole-table CSS computed once from the Status categories instead of per cell
+    styles = pd.DataFrame("", index=final_table.index, columns=final_table.columns)
+    styles["Status"] = final_table["Status"].map(status_styles).astype(object).fillna("")
+    return styles
 
+styles = status_style_frame(final_table)
 styled_df = (
     final_table.style
     .format({"Refund %": "{:.2f}%", "Sales Volume": "{:,}"})
-    .applymap(style_status, subset=["Status"])
+    .apply(lambda _: styles, axis=None)
     .set_properties(**{
         'background-color': '#111111',
         'color': '#ffffff',
@@ -1,11 +1,14 @@
 import pandas as pd
+import streamlit as st
 
-@staticmethod
+@st.cache_data(show_spinner=False)
 def load_data(file):
+    # Cached on the uploaded file's contents, so re-uploads skip the parse
     if file.name.endswith(".csv"):
         return pd.read_csv(
             file,
-            low_memory=False
+            engine="pyarrow",
+            dtype_backend="pyarrow"
         )
     elif file.name.endswith(".parquet"):
         return pd.read_parquet(file)